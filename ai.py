@@ -1,58 +1,321 @@
 import os
 import json
-from typing import Dict, Any
-from openai import OpenAI
+import logging
+import functools
+import importlib.util
+from typing import Dict, Any, List, Optional
 
+from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient
 
+import ai_cache
 
-def ask_model(
-    prompt: str,
-    task: str,
-    student_answer: str) -> Dict[str, Any]:
+try:
+    # Optional: faster parsing of model replies, which matters for large batch replies
+    from orjson import loads as _loads
+except ImportError:
+    from json import loads as _loads
 
-    client = OpenAI(
-        api_key=os.environ.get("OPENAI_API_KEY"),
-        base_url=os.environ.get("OPENAI_BASE_URL"),
-    )
-    model = os.environ.get("OPENAI_MODEL", "gpt-4o")
 
-    response = client.chat.completions.create(
-        model=model,
+# A child of main.py's "grader" logger, so this output goes through the same queue and stays in order
+logger = logging.getLogger("grader.ai")
+
+# Read once at import; the environment is expected to be set up (`source .env`) before start
+API_KEY = os.environ.get("OPENAI_API_KEY")
+BASE_URL = os.environ.get("OPENAI_BASE_URL")
+MODEL = os.environ.get("OPENAI_MODEL", "gpt-4o")
+
+# A grade with a short comment fits easily; retries use a little randomness to get unstuck
+MAX_TOKENS = 256
+RETRY_TEMPERATURE = 0.2
+# Errors raised when the model reply is not the JSON we asked for
+PARSE_ERRORS = (ValueError, KeyError, TypeError)
+
+# Set OPENAI_JSON_SCHEMA=1 when the provider supports structured outputs (OpenAI does, DeepSeek does not)
+# to have the reply validated server-side instead of relying on JSON mode
+JSON_SCHEMA_ENABLED = os.environ.get("OPENAI_JSON_SCHEMA") == "1"
+
+_GRADE_PROPERTIES = {
+    "grade": {"type": "string"},
+    "comment": {"type": "string"},
+}
+# Strict mode requires every property to be listed as required, so an empty comment is ""
+GRADE_SCHEMA = {
+    "type": "object",
+    "properties": _GRADE_PROPERTIES,
+    "required": ["grade", "comment"],
+    "additionalProperties": False,
+}
+BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"id": {"type": "integer"}, **_GRADE_PROPERTIES},
+                "required": ["id", "grade", "comment"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["results"],
+    "additionalProperties": False,
+}
+
+BATCH_INSTRUCTIONS = (
+    'The user message is a JSON list of student answers: [{"id": 0, "answer": "..."}, ...]. '
+    "Grade every answer independently using the rules above. Return JSON only, in the form "
+    '{"results": [{"id": 0, "grade": "...", "comment": "..."}, ...]} with exactly one entry per id.'
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_client() -> OpenAI:
+    """Return a shared client so HTTP connections and TLS setup are reused between calls."""
+    return OpenAI(api_key=API_KEY, base_url=BASE_URL)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_async_client() -> AsyncOpenAI:
+    """Async counterpart of `_get_client`, shared by concurrent `aask_model` calls.
+
+    Uses HTTP/2 when the optional `h2` package is installed, so concurrent requests are
+    multiplexed over one connection instead of each holding its own. Connection limits keep the
+    SDK defaults (1000 connections), far above any sensible --concurrency.
+    """
+    http_client = DefaultAsyncHttpxClient(http2=importlib.util.find_spec("h2") is not None)
+    return AsyncOpenAI(api_key=API_KEY, base_url=BASE_URL, http_client=http_client)
+
+
+def _response_format(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    if not JSON_SCHEMA_ENABLED:
+        return {"type": "json_object"}
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+def _completion_kwargs(prompt: str, task: str, student_answer: str,
+                       temperature: float = 0, max_tokens: int = MAX_TOKENS) -> Dict[str, Any]:
+    return dict(
+        model=MODEL,
+        # Invariant content goes first so providers can serve it from their prefix cache;
+        # only the student answer differs between calls
         messages=[
             {"role": "system", "content": prompt},
             {"role": "system", "content": f"Task: {task}"},
             {"role": "user", "content": student_answer},
         ],
-        response_format={
-            'type': 'json_object'
-        },
-        max_tokens=8192,
-        temperature=1.3,
-        stream=False,
+        response_format=_response_format("grade", GRADE_SCHEMA),
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=True,
+        stream_options={"include_usage": True},
     )
 
-    log_token_usage(response)
 
-    return parse_response(response)
+def _batch_completion_kwargs(prompt: str, task: str, answers: List[str], temperature: float = 0) -> Dict[str, Any]:
+    batch = [{"id": i, "answer": answer} for i, answer in enumerate(answers)]
+    kwargs = _completion_kwargs(prompt, task, json.dumps(batch, ensure_ascii=False),
+                                temperature=temperature, max_tokens=MAX_TOKENS * len(answers))
+    # Keep the batch instructions after the shared prefix so it stays cacheable
+    kwargs["messages"].insert(-1, {"role": "system", "content": BATCH_INSTRUCTIONS})
+    kwargs["response_format"] = _response_format("grades", BATCH_SCHEMA)
+    return kwargs
+
+
+@ai_cache.cached(MODEL)
+def ask_model(
+    prompt: str,
+    task: str,
+    student_answer: str) -> Dict[str, Any]:
+
+    try:
+        result = _request(prompt, task, student_answer)
+    except PARSE_ERRORS as e:
+        logger.warning(f"  Unusable model response ({e!r}), retrying")
+        result = _request(prompt, task, student_answer, temperature=RETRY_TEMPERATURE)
+
+    return result
+
+
+@ai_cache.cached(MODEL)
+async def aask_model(
+    prompt: str,
+    task: str,
+    student_answer: str) -> Dict[str, Any]:
+    """Async version of `ask_model` for grading many students concurrently."""
 
-def log_token_usage(response):
-    if response.usage:
-        usage = response.usage
+    try:
+        result = await _arequest(prompt, task, student_answer)
+    except PARSE_ERRORS as e:
+        logger.warning(f"  Unusable model response ({e!r}), retrying")
+        result = await _arequest(prompt, task, student_answer, temperature=RETRY_TEMPERATURE)
+
+    return result
+
+
+async def aask_model_batch(
+    prompt: str,
+    task: str,
+    answers: List[str]) -> List[Dict[str, Any]]:
+    """Grade several answers with one request. Results are returned in the order of `answers`."""
+
+    results = [ai_cache.get(MODEL, prompt, task, answer) for answer in answers]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if not missing:
+        return results
+
+    batch = [answers[i] for i in missing]
+    try:
+        batch_results = await _arequest_batch(prompt, task, batch)
+    except PARSE_ERRORS as e:
+        logger.warning(f"  Unusable model response ({e!r}), retrying")
+        batch_results = await _arequest_batch(prompt, task, batch, temperature=RETRY_TEMPERATURE)
+
+    for i, result in zip(missing, batch_results):
+        ai_cache.put(MODEL, prompt, task, answers[i], result)
+        results[i] = result
+    return results
+
+
+def _request(prompt: str, task: str, student_answer: str, temperature: float = 0) -> Dict[str, Any]:
+    client = _get_client()
+    stream = client.chat.completions.create(**_completion_kwargs(prompt, task, student_answer, temperature))
+    content = StreamedJSON()
+    with stream:
+        for chunk in stream:
+            if content.feed(chunk):
+                break
+
+    log_token_usage(content.usage)
+
+    return parse_result(content.json())
+
+
+async def _arequest(prompt: str, task: str, student_answer: str, temperature: float = 0) -> Dict[str, Any]:
+    client = _get_async_client()
+    stream = await client.chat.completions.create(**_completion_kwargs(prompt, task, student_answer, temperature))
+    content = await _read_async_stream(stream)
+
+    log_token_usage(content.usage)
+
+    return parse_result(content.json())
+
+
+async def _arequest_batch(prompt: str, task: str, answers: List[str], temperature: float = 0) -> List[Dict[str, Any]]:
+    client = _get_async_client()
+    stream = await client.chat.completions.create(**_batch_completion_kwargs(prompt, task, answers, temperature))
+    content = await _read_async_stream(stream)
+
+    log_token_usage(content.usage)
+
+    return parse_batch_results(content.json(), len(answers))
+
+
+async def _read_async_stream(stream) -> "StreamedJSON":
+    content = StreamedJSON()
+    async with stream:
+        async for chunk in stream:
+            if content.feed(chunk):
+                break
+    return content
+
+
+class StreamedJSON:
+    """Collects a streamed completion and parses it as soon as it holds a complete JSON object.
+
+    Brace depth is tracked across chunks (ignoring braces inside strings), so the end of the
+    object is found in one pass and the text is parsed once. Once the object is complete,
+    reading stops at the first chunk with more content (JSON mode is known to trail
+    whitespace up to max_tokens), while the final content-less chunks that carry finish
+    reason and usage are still consumed.
+    """
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self) -> None:
+        self.parts: List[str] = []
+        self.usage = None
+        self.data: Any = None
+        # Scanner state over all content fed so far
+        self._length = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk) -> bool:
+        """Consume a chunk; return True when the rest of the stream is not needed."""
+        if chunk.usage:
+            self.usage = chunk.usage
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            return False
+        if self.data is not None:
+            return True
+        delta = chunk.choices[0].delta.content
+        self.parts.append(delta)
+        end = self._scan(delta)
+        self._length += len(delta)
+        if end is not None:
+            try:
+                # Anything after the object in this chunk is trailing output and is left out
+                self.data = _loads("".join(self.parts)[:self._length - len(delta) + end])
+            except ValueError:
+                pass
+        return False
+
+    def _scan(self, delta: str) -> Optional[int]:
+        """Advance the scanner over `delta`; return the offset just past the closing brace of the
+        top-level object if it is in `delta`."""
+        for i, ch in enumerate(delta):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    return i + 1
+        return None
+
+    def json(self) -> Any:
+        if self.data is not None:
+            return self.data
+        text = "".join(self.parts)
+        if not text.strip():
+            raise ValueError("Model returned nothing")
+        # Either the object is followed by extra output, or it is incomplete/malformed
+        # and json raises a descriptive error
+        return self._decoder.raw_decode(text.lstrip())[0]
+
+
+def log_token_usage(usage):
+    if usage:
         pt = usage.prompt_tokens
         ct = usage.completion_tokens
         tt = usage.total_tokens
-        print(f"API usage: prompt_tokens={pt}, completion_tokens={ct}, total_tokens={tt}")
-        if usage.prompt_tokens_details and usage.prompt_tokens_details.cached_tokens:
-            ch = usage.prompt_tokens_details.cached_tokens
-            print(f"Cache ratio: {ch * 100 / pt:.2f}")
+        logger.info(f"API usage: prompt_tokens={pt}, completion_tokens={ct}, total_tokens={tt}")
+        if pt:
+            logger.info(f"Cache ratio: {cached_tokens(usage) * 100 / pt:.2f}")
 
-def parse_response(response):
-    content = response.choices[0].message.content
-    if content is None:
-        raise Exception("Model returned nothing")
+def cached_tokens(usage) -> int:
+    """Number of prompt tokens served from the provider's prompt cache."""
+    if usage.prompt_tokens_details and usage.prompt_tokens_details.cached_tokens:
+        return usage.prompt_tokens_details.cached_tokens
+    # DeepSeek reports cache hits in its own field instead of prompt_tokens_details
+    return getattr(usage, "prompt_cache_hit_tokens", None) or 0
 
-    data = json.loads(content)
+def parse_batch_results(data: Dict[str, Any], count: int) -> List[Dict[str, Any]]:
+    by_id = {int(item["id"]): item for item in data["results"]}
+    # Missing ids raise KeyError, same as a missing grade in a single response
+    return [parse_result(by_id[i]) for i in range(count)]
 
+def parse_result(data: Dict[str, Any]) -> Dict[str, Any]:
     # Minimal validation and conversion; allow exceptions to propagate if keys are missing or types are wrong
     grade = float(data["grade"])  # may raise KeyError/ValueError
     comment = str(data.get("comment", ""))
@@ -64,4 +327,6 @@ if __name__ == "__main__":
     example_task = "1) Explan how to vibe code (1 point): Student mentions coursor (0.5 points), Stunent mentions copilot (0.5 points)"
     example_student_answer = "1) You install cursor and then prompt it to get code"
 
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     print(ask_model(example_prompt, example_task, example_student_answer))
@@ -0,0 +1,97 @@
+"""Persistent cache of model results.
+
+Results are stored in a SQLite database keyed by a hash of (model, prompt, task, answer),
+so re-runs (after a crash, a dry run or a tweak for a single student) do not pay for
+answers that were already graded. Results are also kept in memory, so identical answers
+within one run are graded once even after `disable()` turns the database off.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import inspect
+import functools
+from typing import Dict, Any, Optional
+
+
+CACHE_PATH = os.path.join("cache", "ask_model.sqlite")
+
+_enabled = True
+_memory: Dict[bytes, Dict[str, Any]] = {}
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+@functools.lru_cache(maxsize=None)
+def _db() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    db = sqlite3.connect(CACHE_PATH, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("CREATE TABLE IF NOT EXISTS cache (key BLOB PRIMARY KEY, grade REAL, comment TEXT, ts INTEGER)")
+    return db
+
+
+@functools.lru_cache(maxsize=16)
+def _digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode()).digest()
+
+
+def cache_key(model: str, prompt: str, task: str, student_answer: str) -> bytes:
+    # Model, prompt and task are the same for every student of a run, so they are encoded and
+    # hashed once (Python caches a str's hash, making the lookup cheap); only the answer is new
+    answer_digest = hashlib.sha256(student_answer.encode()).digest()
+    return hashlib.sha256(_digest(model) + _digest(prompt) + _digest(task) + answer_digest).digest()
+
+
+def get(model: str, prompt: str, task: str, student_answer: str) -> Optional[Dict[str, Any]]:
+    key = cache_key(model, prompt, task, student_answer)
+    if key in _memory:
+        return _memory[key]
+    if not _enabled:
+        return None
+    row = _db().execute("SELECT grade, comment FROM cache WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+    _memory[key] = {"grade": row[0], "comment": row[1]}
+    return _memory[key]
+
+
+def put(model: str, prompt: str, task: str, student_answer: str, result: Dict[str, Any]) -> None:
+    key = cache_key(model, prompt, task, student_answer)
+    _memory[key] = result
+    if not _enabled:
+        return
+    _db().execute(
+        "INSERT OR REPLACE INTO cache (key, grade, comment, ts) VALUES (?, ?, ?, ?)",
+        (key, result["grade"], result["comment"], int(time.time())),
+    )
+
+
+def cached(model: str):
+    """Decorate a (possibly async) `f(prompt, task, student_answer) -> result` with the cache."""
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(prompt: str, task: str, student_answer: str) -> Dict[str, Any]:
+                result = get(model, prompt, task, student_answer)
+                if result is None:
+                    result = await func(prompt, task, student_answer)
+                    put(model, prompt, task, student_answer, result)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(prompt: str, task: str, student_answer: str) -> Dict[str, Any]:
+            result = get(model, prompt, task, student_answer)
+            if result is None:
+                result = func(prompt, task, student_answer)
+                put(model, prompt, task, student_answer, result)
+            return result
+        return wrapper
+
+    return decorator
@@ -1,11 +1,20 @@
 """Minimal Canvas initializer.
 
-Provides a single init(course_id) function that returns a Course object.
-No error handling or extras - intentionally minimal.
+Provides a single init() function that returns a Course object.
+The only extra is a larger, retrying connection pool, so parallel requests
+reuse keep-alive connections instead of opening new ones.
 """
 
 import os
 from canvasapi import Canvas
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# One session is shared by every Canvas call. Its pool must hold a keep-alive connection for
+# each thread that talks to Canvas at once (update writers, student lookups, listing producer)
+POOL_CONNECTIONS = 32
+POOL_MAXSIZE = 64
 
 
 def init():
@@ -13,4 +22,18 @@ def init():
     API_URL = os.environ.get("CANVAS_API_URL", "https://canvas.instructure.com")
     API_KEY = os.environ.get("CANVAS_API_KEY")
     canvas = Canvas(API_URL, API_KEY)
+
+    # canvasapi does not expose its session, so reach into the requester
+    session = canvas._Canvas__requester._session
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        # Reads only: a resent grade PUT/POST that Canvas already applied would post the
+        # comment twice. Retry-After on 429 is honoured
+        max_retries=Retry(total=5, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504],
+                          allowed_methods=frozenset({"GET", "HEAD"})),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
     return canvas.get_course(COURSE_ID)
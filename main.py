@@ -8,15 +8,60 @@ Behavior changes:
  - If --students is omitted, grades ALL students in the course
  - Skips students that already have a recorded grade
  - Passes (prompt, task, student_answer) to `ask_model`
+ - Unless --confirmation is 'full', asks the model about all students concurrently
+ - Reuses model results stored by earlier runs for identical inputs, unless --no-cache is given
+ - --mode review-first writes proposals to a TSV; --mode apply-reviews uploads the edited file
 """
 
+import os
 import sys
 import csv
+import time
+import queue
+import logging
+import logging.handlers
+import asyncio
 import argparse
-from typing import List, Tuple, Any
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from typing import List, Tuple, Any, Dict, Optional, Iterable, Iterator, Callable
 
+from canvasapi.user import User
+
+import ai_cache
 from canvas_client import init
-from ai import ask_model
+from ai import ask_model, aask_model, aask_model_batch
+
+
+# --confirmation mode -> whether a result with the given comment needs the user's decision
+CONFIRM_NEEDS_PROMPT = {
+    "full": lambda comment: True,
+    "none": lambda comment: False,
+    "mistakes": lambda comment: bool(comment),
+}
+
+logger = logging.getLogger("grader")
+log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# Grade updates are sent in the background so the next student does not wait for Canvas
+WRITE_POOL = ThreadPoolExecutor(max_workers=8)
+pending_updates: Dict[Future, Any] = {}
+
+# Grades applied without confirmation are collected here and sent in a single bulk update
+pending_grades: Dict[int, Dict[str, Any]] = {}
+BULK_POLL_INTERVAL = 1.0
+# Give up waiting for Canvas' bulk update job after this many seconds
+BULK_TIMEOUT = 300.0
+
+# Submission states that still need a grade
+GRADABLE_STATES = ("submitted", "pending_review")
+
+# Answers listed ahead of the model calls in the concurrent path
+QUEUE_SIZE = 32
+
+# Header of the review TSV written in review-first mode; assignment_id lets apply-reviews
+# refuse a file that was written for another assignment
+REVIEW_COLUMNS = ["assignment_id", "user_id", "name", "grade", "comment"]
 
 
 def load_students_from_csv(path: str) -> List[str]:
@@ -40,159 +85,337 @@ def grade_of(submission: Any) -> str:
     """Return a string representation of an existing grade or empty string if none."""
     if submission is None:
         return ""
-    for attr in ("score", "grade", "posted_grade", "entered_grade"):
-        val = getattr(submission, attr, None)
+    # canvasapi keeps response fields in the instance __dict__; reading it directly skips
+    # attribute lookup, and `score` settles graded submissions without the loop
+    fields = submission.__dict__
+    score = fields.get("score")
+    if score is not None and score != "":
+        return str(score)
+    for attr in ("grade", "posted_grade", "entered_grade"):
+        val = fields.get(attr)
         if val is not None and val != "":
             return str(val)
     return ""
 
 
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Assess student submissions with AI")
-    parser.add_argument("--prompt", required=True, help="Path to prompt.txt")
-    parser.add_argument("--task", required=True, help="Path to task.txt")
-    parser.add_argument("--task-num", type=int, required=True, help="1-indexed task number to assess")
+    parser.add_argument("--prompt", help="Path to prompt.txt (required unless --mode is 'apply-reviews')")
+    parser.add_argument("--task", help="Path to task.txt (required unless --mode is 'apply-reviews')")
+    parser.add_argument("--task-num", type=positive_int, required=True, help="1-indexed task number to assess")
     parser.add_argument("--students", help="Path to students.csv (optional). If omitted, grade all students in the course")
     parser.add_argument("--dry-run", action="store_true", help="Do not update Canvas; just print intended changes")
     parser.add_argument(
         "--confirmation",
-        choices=["full", "none", "mistakes"],
+        choices=list(CONFIRM_NEEDS_PROMPT),
         default="full",
         help=("Confirmation mode: 'full' prompts before each update, 'none' never prompts, "
               "'mistakes' prompts only when model returned a comment"),
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--mode",
+        choices=["grade", "review-first", "apply-reviews"],
+        default="grade",
+        help=("'grade' grades and updates Canvas in one go; 'review-first' only writes the model's "
+              "proposals to --review-file; 'apply-reviews' uploads the (edited) --review-file"),
+    )
+    parser.add_argument("--review-file", default=os.path.join("out", "review.tsv"),
+                        help="TSV with proposed grades used by the review-first/apply-reviews modes")
+    parser.add_argument("--concurrency", type=positive_int, default=16,
+                        help="Max parallel model requests when --confirmation is 'none' or 'mistakes', or in review-first mode")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not use results stored in cache/ask_model.sqlite by earlier runs")
+    parser.add_argument("--batch-size", type=positive_int, default=1,
+                        help="Number of answers graded per model request when --confirmation is 'none' or 'mistakes'")
+    args = parser.parse_args()
+    if args.mode == "apply-reviews" and not os.path.isfile(args.review_file):
+        parser.error(f"review file {args.review_file} not found; write it with --mode review-first")
+    return args
 
 
 def load_prompt_task(args: argparse.Namespace) -> Tuple[str, str]:
     if not args.prompt or not args.task:
         raise SystemExit("Both --prompt and --task paths are required")
     try:
-        prompt_text = load_text_file(args.prompt, "prompt")
-        task_text = load_text_file(args.task, "task")
+        # Independent reads, so do them side by side
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            prompt_future = pool.submit(load_text_file, args.prompt, "prompt")
+            task_future = pool.submit(load_text_file, args.task, "task")
+            prompt_text, task_text = prompt_future.result(), task_future.result()
     except Exception as e:
-        print(f"Error loading files: {e}", file=sys.stderr)
+        logger.error(f"Error loading files: {e}")
         raise SystemExit(2)
     return prompt_text, task_text
 
 
 def choose_assignment(course, task_num: int):
-    assignments = list(course.get_assignments())
-    if not assignments:
-        raise SystemExit("No assignments found in course")
     if task_num is None:
         raise SystemExit("No task number specified. Provide --task-num")
-    if task_num < 1 or task_num > len(assignments):
-        raise SystemExit(f"Invalid task_num {task_num}. Available assignments: {len(assignments)}")
-    assignment = assignments[task_num - 1]
-    print(f"Assignment: {assignment.name}")
+    # Stop paging as soon as the requested assignment is reached
+    assignments = course.get_assignments(per_page=100)
+    count = 0
+    assignment = None
+    for count, candidate in enumerate(assignments, start=1):
+        if count == task_num:
+            assignment = candidate
+            break
+    if assignment is None:
+        if count == 0:
+            raise SystemExit("No assignments found in course")
+        raise SystemExit(f"Invalid task_num {task_num}. Available assignments: {count}")
+    logger.info(f"Assignment: {assignment.name}")
     return assignment
 
 
-def build_students_to_process(course, students_path=None) -> List[Any]:
-    # Prepare list of students to process
-    all_users = list(course.get_users())
-    user_map = {user.name: user for user in all_users}
+def find_student(course, name: str):
+    """Find a student by exact name using Canvas' server-side search; None if there is no such student."""
+    for user in course.get_users(search_term=name, enrollment_type=["student"]):
+        if user.name == name:
+            return user
+    return None
 
-    if students_path:
-        requested_students = load_students_from_csv(students_path)
-        print(f"Loaded {len(requested_students)} students from {students_path}")
 
-        # Map requested names to user objects, warn if not found
-        students_to_process: List[Any] = []
-        for name in requested_students:
-            user = user_map.get(name)
-            if not user:
-                print(f"  WARNING: Student '{name}' not found in Canvas, skipping")
-                continue
-            students_to_process.append(user)
-    else:
-        # Process all students in the course
-        students_to_process = list(course.get_users(enrollment_type=["student"]))
-        print(f"Grading all {len(students_to_process)} students in the course")
+def build_students_to_process(course, students_path: str) -> List[Any]:
+    """Resolve the students listed in the CSV at `students_path` to Canvas users."""
+    requested_students = load_students_from_csv(students_path)
+    logger.info(f"Loaded {len(requested_students)} students from {students_path}")
+
+    # Look up only the requested names, in parallel, instead of paging the whole roster
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        found = list(ex.map(lambda name: find_student(course, name), requested_students))
+
+    # Warn about names that were not found
+    students_to_process: List[Any] = []
+    for name, user in zip(requested_students, found):
+        if not user:
+            logger.warning(f"  WARNING: Student '{name}' not found in Canvas, skipping")
+            continue
+        students_to_process.append(user)
 
     return students_to_process
 
 
-def apply_update(submission, grade, comment, dry_run: bool) -> None:
-    payload = {
-        'submission': {'posted_grade': grade},
-        'comment': {'text_comment': comment} if comment else None,
-    }
+def apply_update(submission, grade, comment, dry_run: bool, bulk: bool = False) -> None:
+    if bulk and not dry_run:
+        # The bulk path builds its own grade_data, so skip the edit() payload entirely
+        queue_bulk_update(submission.user_id, grade, comment)
+        logger.info(f"  ✓ Queued for bulk update")
+        return
+    sub_payload = {'posted_grade': grade}
+    com_payload = {'text_comment': comment} if comment else None
     if dry_run:
-        print(f"  DRY-RUN: would update with: {payload}")
+        logger.info(f"  DRY-RUN: would update with: {{'submission': {sub_payload}, 'comment': {com_payload}}}")
+        return
+    # perform actual update in the background; wait_for_updates() reports the outcome
+    future = WRITE_POOL.submit(submission.edit, submission=sub_payload, comment=com_payload)
+    pending_updates[future] = submission
+    logger.info(f"  ✓ Update queued")
+
+
+def queue_bulk_update(user_id: int, grade, comment: Optional[str]) -> None:
+    """Add a grade to the single bulk update sent by flush_bulk_updates()."""
+    grade_data = {'posted_grade': grade}
+    if comment:
+        grade_data['text_comment'] = comment
+    pending_grades[user_id] = grade_data
+
+
+def wait_for_updates() -> None:
+    """Wait for all queued Canvas updates and report the ones that failed."""
+    failed = 0
+    for future in as_completed(pending_updates):
+        try:
+            future.result()
+        except Exception as e:
+            failed += 1
+            user_id = getattr(pending_updates[future], "user_id", "?")
+            logger.error(f"  ERROR: update for user {user_id} failed: {e}")
+    if pending_updates:
+        logger.info(f"Updated {len(pending_updates) - failed} of {len(pending_updates)} submissions")
+    pending_updates.clear()
+
+
+def display_name(user) -> str:
+    return getattr(user, "name", str(user))
+
+
+def flush_bulk_updates(assignment) -> None:
+    """Send all queued auto-applied grades in one request and wait for Canvas to process them.
+
+    The batch is taken out of `pending_grades` before it is sent, so a failed or interrupted
+    update is reported (with the affected user ids) and never sent a second time.
+    """
+    if not pending_grades:
+        return
+    grade_data = dict(pending_grades)
+    pending_grades.clear()
+    unsaved = f"grades may not be saved for user ids: {', '.join(map(str, sorted(grade_data)))}"
+
+    logger.info(f"Sending {len(grade_data)} grades in one bulk update...")
+    try:
+        progress = assignment.submissions_bulk_update(grade_data=grade_data)
+        deadline = time.monotonic() + BULK_TIMEOUT
+        while progress.workflow_state in ("queued", "running"):
+            if time.monotonic() > deadline:
+                logger.error(f"  ERROR: bulk update still {progress.workflow_state} after {BULK_TIMEOUT:.0f}s; {unsaved}")
+                return
+            time.sleep(BULK_POLL_INTERVAL)
+            progress = progress.query()
+    except Exception as e:
+        logger.error(f"  ERROR: bulk update failed: {e!r}; {unsaved}")
+        return
+    if progress.workflow_state == "completed":
+        logger.info(f"Bulk update completed for {len(grade_data)} submissions")
+    else:
+        message = getattr(progress, "message", None) or "no details"
+        logger.error(f"  ERROR: bulk update {progress.workflow_state}: {message}; {unsaved}")
+
+
+def print_header(title: str) -> None:
+    logger.info(f"\n{'='*60}")
+    logger.info(title)
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Send grader output (including ai.py's "grader.ai" logger) through a queue.
+
+    A background thread writes errors to stderr and everything else to stdout, so workers only
+    enqueue records and terminal writes do not stall grading.
+    """
+    global _listener
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    stdout_handler = logging.StreamHandler(sys.stdout)
+    stdout_handler.addFilter(lambda record: record.levelno < logging.ERROR)
+    stderr_handler = logging.StreamHandler(sys.stderr)
+    stderr_handler.setLevel(logging.ERROR)
+    _listener = logging.handlers.QueueListener(log_queue, stdout_handler, stderr_handler,
+                                               respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def ask(prompt: str) -> str:
+    """input() that first lets all queued output reach the terminal."""
+    if _listener is not None:
+        log_queue.join()
+    return input(prompt)
+
+
+def list_gradable_submissions(course, assignment, **kwargs) -> Iterator[Any]:
+    """Lazily list the assignment's submissions that wait for a grade.
+
+    Canvas filters by a single workflow_state per request, so "submitted" and "pending_review"
+    (e.g. needing manual grading after a partial auto-grade) are listed one after the other.
+    """
+    for state in GRADABLE_STATES:
+        yield from course.get_multiple_submissions(
+            assignment_ids=[assignment.id],
+            workflow_state=state,
+            per_page=100,
+            **kwargs,
+        )
+
+
+def iter_submissions(course, assignment, users: Optional[List[Any]] = None) -> Iterator[Tuple[Any, Any]]:
+    """Yield (user, submission) pairs for `users` from paginated listings.
+
+    Canvas only returns submissions waiting for a grade (see GRADABLE_STATES), so graded and
+    unsubmitted ones never cross the wire. With users=None, covers every student in the
+    course; user records come embedded in the listing, so the roster is never fetched, and
+    pages are fetched lazily while iterating, so grading can start before the listing ends.
+    Given `users`, their submissions are listed in full and yielded in the order of `users`.
+    """
+    if users is None:
+        for submission in list_gradable_submissions(course, assignment, student_ids=["all"], include=["user"]):
+            yield User(submission._requester, submission.user), submission
         return
-    # perform actual update
-    submission.edit(submission=payload['submission'], comment=payload['comment'])
-    print(f"  ✓ Updated successfully")
 
+    # An empty student_ids filter would list every student in the course
+    if not users:
+        logger.info("No students to grade")
+        return
 
-def process_student(course, user, assignment, prompt_text: str, task_text: str, dry_run: bool = False, confirmation_mode: str = "full") -> None:
-    display_name = getattr(user, "name", str(user))
-    print(f"\n{'='*60}")
-    print(f"Processing: {display_name}")
+    position = {user.id: i for i, user in enumerate(users)}
+    listed = sorted(
+        (submission for submission in list_gradable_submissions(course, assignment, student_ids=list(position))
+         if submission.user_id in position),
+        key=lambda submission: position[submission.user_id],
+    )
+    listed_ids = {submission.user_id for submission in listed}
+    for user in users:
+        if user.id not in listed_ids:
+            logger.info(f"  SKIP: {display_name(user)} has no submission waiting for a grade")
+    for submission in listed:
+        yield users[position[submission.user_id]], submission
 
-    submission = assignment.get_submission(user.id)
 
+def answer_of(submission) -> Optional[str]:
+    """Return the answer text to grade, or None when the submission should be skipped."""
     # Skip if already graded
     existing_grade = grade_of(submission)
     if existing_grade != "":
-        print(f"  SKIP: Already graded (grade: {existing_grade})")
-        return
+        logger.info(f"  SKIP: Already graded (grade: {existing_grade})")
+        return None
 
     # Skip empty submissions
     if not submission or not getattr(submission, "body", None) or len(submission.body) == 0:
-        print(f"  SKIP: Empty submission")
-        return
+        logger.info(f"  SKIP: Empty submission")
+        return None
 
     student_answer = submission.body
-    print(f"  Submission length: {len(student_answer)} characters")
+    logger.info(f"  Submission length: {len(student_answer)} characters")
+    return student_answer
 
-    # Ask AI model with (prompt, task, student_answer)
-    print(f"  Asking AI model...")
-    result = ask_model(prompt_text, task_text, student_answer)
 
+def review_result(course, user, assignment, submission, result, dry_run: bool = False, confirmation_mode: str = "full") -> None:
     grade = result.get("grade")
     comment = result.get("comment")
 
-    print(f"  Grade: {grade}")
-    print(f"  Comment: {comment if comment else '(no comment)'}")
-
-    # Decide whether to prompt the user
-    should_prompt = False
-    if confirmation_mode == "full":
-        should_prompt = True
-    elif confirmation_mode == "mistakes" and comment:
-        should_prompt = True
-    elif confirmation_mode == "none":
-        should_prompt = False
+    logger.info(f"  Grade: {grade}")
+    logger.info(f"  Comment: {comment if comment else '(no comment)'}")
 
-    if not should_prompt:
+    if not CONFIRM_NEEDS_PROMPT[confirmation_mode](comment):
         # Auto-apply
-        apply_update(submission, grade, comment, dry_run)
+        apply_update(submission, grade, comment, dry_run, bulk=True)
         return
 
+    # SpeedGrader URL for the manual option, built once rather than on every menu round
+    course_id = getattr(assignment, "course_id", None) or getattr(course, "id", None) or getattr(course, "course_id", None)
+    manual_url = (f"https://canvas.instructure.com/courses/{course_id}/gradebook/speed_grader"
+                  f"?assignment_id={getattr(assignment, 'id', None)}&student_id={getattr(user, 'id', None)}")
+
     # Interactive confirmation flow
     while True:
-        print("[A] Accept / [E] Edit / [M] Manual")
-        choice = input("Choose action: ").strip().lower()
+        logger.info("[A] Accept / [E] Edit / [M] Manual")
+        choice = ask("Choose action: ").strip().lower()
         if choice == "a":
             apply_update(submission, grade, comment, dry_run)
             return
         elif choice == "e":
             # Prompt for grade override (press Enter to accept current)
             while True:
-                g_in = input(f"  Enter grade (press Enter to accept current {grade}): ").strip()
+                g_in = ask(f"  Enter grade (press Enter to accept current {grade}): ").strip()
                 if g_in == "":
                     break
                 try:
                     grade = float(g_in)
                     break
                 except ValueError:
-                    print("  Invalid grade, please enter a numeric value or press Enter to keep current.")
+                    logger.info("  Invalid grade, please enter a numeric value or press Enter to keep current.")
 
             # Prompt for comment override (press Enter to accept current, ':q' to set empty)
-            c_in = input("  Enter comment (press Enter to for an empty comment): ").strip()
+            c_in = ask("  Enter comment (press Enter to for an empty comment): ").strip()
             if c_in == "":
                 # keep current comment
                 pass
@@ -202,38 +425,268 @@ def process_student(course, user, assignment, prompt_text: str, task_text: str,
             apply_update(submission, grade, comment, dry_run)
             return
         elif choice == "m":
-            # Build SpeedGrader URL using available IDs
-            course_id = getattr(assignment, "course_id", None) or getattr(course, "id", None) or getattr(course, "course_id", None)
-            assignment_id = getattr(assignment, "id", None)
-            student_id = getattr(user, "id", None)
-            url = f"https://canvas.instructure.com/courses/{course_id}/gradebook/speed_grader?assignment_id={assignment_id}&student_id={student_id}"
-            print(f"Manual review link: {url}")
-            cont = input("Continue (Y/n)? ").strip().lower()
+            logger.info(f"Manual review link: {manual_url}")
+            cont = ask("Continue (Y/n)? ").strip().lower()
             if cont == "" or cont == "y":
                 # Do not update from script; assume manual grading will happen externally
-                print("  Skipping update for manual grading")
+                logger.info("  Skipping update for manual grading")
                 return
             else:
                 # go back to menu
                 continue
         else:
-            print("Unknown choice. Please press A, E, or M.")
+            logger.info("Unknown choice. Please press A, E, or M.")
+
+
+def process_student(course, user, assignment, submission, prompt_text: str, task_text: str, dry_run: bool = False, confirmation_mode: str = "full") -> None:
+    print_header(f"Processing: {display_name(user)}")
+
+    student_answer = answer_of(submission)
+    if student_answer is None:
+        return
+
+    # Ask AI model with (prompt, task, student_answer)
+    logger.info(f"  Asking AI model...")
+    result = ask_model(prompt_text, task_text, student_answer)
+
+    review_result(course, user, assignment, submission, result, dry_run, confirmation_mode)
+
+
+async def grade_concurrently(submissions: Iterable[Tuple[Any, Any]], prompt_text: str, task_text: str,
+                             concurrency: int, batch_size: int,
+                             handle_result: Callable[[Any, Any, Dict[str, Any]], None]) -> None:
+    """Grade students while their submissions are still being listed.
+
+    A producer walks `submissions` (a lazily paginated listing) in a worker thread and queues
+    answers; `concurrency` consumers ask the model, each taking `batch_size` queued answers per
+    request (fewer at the end of the listing). Students with identical answers share one model
+    call. `handle_result(user, submission, result)` is called as soon as a result arrives.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    results_by_answer: Dict[str, asyncio.Future] = {}
+    loop = asyncio.get_running_loop()
+
+    async def produce() -> None:
+        items = iter(submissions)
+        try:
+            # next() may fetch the next page over HTTP, so keep it off the event loop
+            while (item := await asyncio.to_thread(next, items, None)) is not None:
+                user, submission = item
+                print_header(f"Checking: {display_name(user)}")
+                student_answer = answer_of(submission)
+                if student_answer is not None:
+                    await queue.put((user, submission, student_answer))
+        finally:
+            # One stop marker per consumer
+            for _ in range(concurrency):
+                await queue.put(None)
+
+    async def grade(batch: List[Tuple[Any, Any, str]]) -> None:
+        requested: Dict[str, asyncio.Future] = {}
+        waiting = []
+        for user, submission, answer in batch:
+            future = results_by_answer.get(answer)
+            if future is None:
+                future = results_by_answer[answer] = requested[answer] = loop.create_future()
+            waiting.append((user, submission, future))
+
+        if requested:
+            answers = list(requested)
+            try:
+                if len(answers) == 1:
+                    results = [await aask_model(prompt_text, task_text, answers[0])]
+                else:
+                    results = await aask_model_batch(prompt_text, task_text, answers)
+                for answer, result in zip(answers, results):
+                    requested[answer].set_result(result)
+            except Exception as e:
+                # A failed request only loses the students waiting on it; later students with
+                # the same answer ask again instead of inheriting the error
+                for answer, future in requested.items():
+                    del results_by_answer[answer]
+                    if not future.done():
+                        future.set_exception(e)
+
+        for user, submission, future in waiting:
+            try:
+                result = await future
+            except Exception as e:
+                logger.error(f"  ERROR: grading {display_name(user)} failed: {e!r}")
+                continue
+            try:
+                handle_result(user, submission, result)
+            except Exception as e:
+                # e.g. the review file cannot be written; the other students go on
+                logger.error(f"  ERROR: handling the result for {display_name(user)} failed: {e!r}")
+
+    async def consume() -> None:
+        while (item := await queue.get()) is not None:
+            batch = [item]
+            stop = False
+            # Listing is fast compared to a model call, so wait for a full batch
+            while len(batch) < batch_size:
+                item = await queue.get()
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            await grade(batch)
+            if stop:
+                return
+
+    logger.info(f"\nAsking AI model about submissions as they arrive (concurrency: {concurrency})...")
+    producer = asyncio.create_task(produce())
+    consumers = [asyncio.create_task(consume()) for _ in range(concurrency)]
+    try:
+        await asyncio.wait([producer, *consumers], return_when=asyncio.FIRST_EXCEPTION)
+        failed = [task for task in consumers if task.done() and task.exception() is not None]
+        if failed:
+            # Nothing drains the bounded queue any more, so stop instead of blocking the producer forever
+            raise failed[0].exception()
+        # If the listing failed, answers already queued are still graded before the error surfaces
+        await asyncio.gather(*consumers)
+        producer.result()
+    finally:
+        # When cancelled (Ctrl-C) or a consumer died, nothing that is still queued gets graded
+        for task in (producer, *consumers):
+            task.cancel()
+
+
+def process_students_concurrently(course, submissions: Iterable[Tuple[Any, Any]], assignment, prompt_text: str, task_text: str,
+                                  dry_run: bool = False, confirmation_mode: str = "none", concurrency: int = 16,
+                                  batch_size: int = 1) -> None:
+    """Grade students with concurrent model calls.
+
+    Results that need no confirmation are applied as soon as they arrive; the others are
+    reviewed one by one once all model calls are done.
+    """
+    to_review: List[Tuple[Any, Any, Dict[str, Any]]] = []
+
+    def handle_result(user, submission, result: Dict[str, Any]) -> None:
+        if CONFIRM_NEEDS_PROMPT[confirmation_mode](result.get("comment")):
+            to_review.append((user, submission, result))
+            return
+        print_header(f"Processing: {display_name(user)}")
+        review_result(course, user, assignment, submission, result, dry_run, confirmation_mode)
+
+    asyncio.run(grade_concurrently(submissions, prompt_text, task_text, concurrency, batch_size, handle_result))
+    # Send the auto-applied grades before the (possibly long, interruptible) review below
+    flush_bulk_updates(assignment)
+
+    for user, submission, result in to_review:
+        print_header(f"Processing: {display_name(user)}")
+        review_result(course, user, assignment, submission, result, dry_run, confirmation_mode)
+
+
+def write_reviews(assignment, submissions: Iterable[Tuple[Any, Any]], prompt_text: str, task_text: str, path: str,
+                  concurrency: int = 16, batch_size: int = 1) -> None:
+    """Grade all students concurrently and write the proposals to a TSV for out-of-band review.
+
+    Edit the file (clear a grade to skip that student), then run with --mode apply-reviews.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, delimiter="\t", lineterminator="\n")
+        writer.writerow(REVIEW_COLUMNS)
+
+        # Called on the event loop thread only, so rows never interleave
+        def handle_result(user, submission, result: Dict[str, Any]) -> None:
+            writer.writerow([assignment.id, submission.user_id, display_name(user), result.get("grade"), result.get("comment") or ""])
+            logger.info(f"  Proposal for {display_name(user)}: {result.get('grade')}")
+
+        asyncio.run(grade_concurrently(submissions, prompt_text, task_text, concurrency, batch_size, handle_result))
+    logger.info(f"\nWrote proposals to {path}; review them and run with --mode apply-reviews")
+
+
+def apply_reviews(path: str, assignment, dry_run: bool) -> None:
+    """Queue the reviewed grades from `path` for one bulk update; rows with an empty grade are skipped.
+
+    Nothing is queued unless every row belongs to `assignment`.
+    """
+    try:
+        with open(path, "r", newline="") as f:
+            rows = list(csv.DictReader(f, delimiter="\t"))
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        raise SystemExit(f"Cannot read review file {path}: {e}")
+    for row in rows:
+        if str(row.get("assignment_id")) != str(assignment.id):
+            raise SystemExit(f"{path} holds grades for assignment {row.get('assignment_id')}, "
+                             f"but --task-num selects assignment {assignment.id} ({assignment.name})")
+
+    for row in rows:
+        grade = row["grade"].strip()
+        if grade == "":
+            logger.info(f"  SKIP: {row['name']} (no grade)")
+            continue
+        comment = row["comment"]
+        if dry_run:
+            logger.info(f"  DRY-RUN: would set {row['name']}: grade={grade}, comment={comment or '(no comment)'}")
+            continue
+        queue_bulk_update(int(row["user_id"]), grade, comment)
 
 
 def main():
     args = parse_args()
+    if args.no_cache:
+        ai_cache.disable()
 
-    prompt_text, task_text = load_prompt_task(args)
+    listener = setup_logging()
+    try:
+        run(args)
+    finally:
+        # Stopping the listener flushes whatever is still queued
+        listener.stop()
+
+
+def run(args: argparse.Namespace) -> None:
+    if args.mode == "apply-reviews":
+        course = init()
+        assignment = choose_assignment(course, args.task_num)
+        apply_reviews(args.review_file, assignment, args.dry_run)
+        flush_bulk_updates(assignment)
+        return
 
-    course = init()
+    # Connect to Canvas (network) while the prompt and task are read from disk
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        course_future = pool.submit(init)
+        prompt_text, task_text = load_prompt_task(args)
+        course = course_future.result()
     assignment = choose_assignment(course, args.task_num)
-    students_to_process = build_students_to_process(course, args.students)
-
-    for user in students_to_process:
-        process_student(course, user, assignment, prompt_text, task_text, dry_run=args.dry_run, confirmation_mode=args.confirmation)
+    if args.students:
+        submissions = iter_submissions(course, assignment, build_students_to_process(course, args.students))
+    else:
+        logger.info("Grading all students in the course")
+        submissions = iter_submissions(course, assignment)
 
-    print(f"\n{'='*60}")
-    print("Assessment complete!")
+    if args.mode == "review-first":
+        write_reviews(assignment, submissions, prompt_text, task_text, args.review_file,
+                      concurrency=args.concurrency, batch_size=args.batch_size)
+        return
+    try:
+        if args.confirmation == "full":
+            # Every student needs a human decision anyway, so grade them one at a time
+            for user, submission in submissions:
+                process_student(course, user, assignment, submission, prompt_text, task_text, dry_run=args.dry_run, confirmation_mode=args.confirmation)
+        else:
+            process_students_concurrently(course, submissions, assignment, prompt_text, task_text,
+                                          dry_run=args.dry_run, confirmation_mode=args.confirmation,
+                                          concurrency=args.concurrency, batch_size=args.batch_size)
+    except KeyboardInterrupt:
+        # Stopped by the user: auto-applied grades that were not sent yet are dropped, not uploaded
+        if pending_grades:
+            logger.info(f"\nInterrupted: {len(pending_grades)} auto-applied grades were not sent")
+            pending_grades.clear()
+        raise
+    finally:
+        # Grades already accepted are sent (and failed edits reported) even if the listing
+        # fails halfway
+        try:
+            flush_bulk_updates(assignment)
+        finally:
+            wait_for_updates()
+
+    logger.info(f"\n{'='*60}")
+    logger.info("Assessment complete!")
 
 
 if __name__ == "__main__":
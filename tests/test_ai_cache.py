@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import ai_cache
+
+
+RESULT = {"grade": 0.5, "comment": "Partly correct"}
+
+
+class AiCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.object(ai_cache, "CACHE_PATH", os.path.join(self.tmp.name, "cache", "test.sqlite"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        ai_cache._db.cache_clear()
+        ai_cache._memory.clear()
+        ai_cache._enabled = True
+        self.addCleanup(self.reset)
+
+    def reset(self):
+        if ai_cache._db.cache_info().currsize:
+            ai_cache._db().close()
+        ai_cache._db.cache_clear()
+        ai_cache._memory.clear()
+        ai_cache._enabled = True
+
+    def test_round_trip(self):
+        self.assertIsNone(ai_cache.get("model", "prompt", "task", "answer"))
+        ai_cache.put("model", "prompt", "task", "answer", RESULT)
+        # Drop the memory layer so the value has to come from SQLite
+        ai_cache._memory.clear()
+        self.assertEqual(ai_cache.get("model", "prompt", "task", "answer"), RESULT)
+        self.assertIsNone(ai_cache.get("model", "prompt", "task", "other answer"))
+        self.assertIsNone(ai_cache.get("other model", "prompt", "task", "answer"))
+
+    def test_disable_keeps_results_in_memory_only(self):
+        ai_cache.disable()
+        ai_cache.put("model", "prompt", "task", "answer", RESULT)
+        self.assertEqual(ai_cache.get("model", "prompt", "task", "answer"), RESULT)
+        self.assertFalse(os.path.exists(ai_cache.CACHE_PATH))
+        ai_cache._memory.clear()
+        self.assertIsNone(ai_cache.get("model", "prompt", "task", "answer"))
+
+    def test_cached_calls_once_per_input(self):
+        calls = []
+
+        @ai_cache.cached("model")
+        def grade(prompt, task, student_answer):
+            calls.append(student_answer)
+            return RESULT
+
+        self.assertEqual(grade("prompt", "task", "answer"), RESULT)
+        self.assertEqual(grade("prompt", "task", "answer"), RESULT)
+        self.assertEqual(calls, ["answer"])
+
+
+if __name__ == "__main__":
+    unittest.main()
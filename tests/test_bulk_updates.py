@@ -0,0 +1,55 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import main
+
+
+class FakeAssignment:
+    def __init__(self, progress=None, error=None):
+        self.progress = progress
+        self.error = error
+        self.calls = []
+
+    def submissions_bulk_update(self, grade_data):
+        self.calls.append(dict(grade_data))
+        if self.error:
+            raise self.error
+        return self.progress
+
+
+class FlushBulkUpdatesTest(unittest.TestCase):
+    def setUp(self):
+        main.pending_grades.clear()
+        self.addCleanup(main.pending_grades.clear)
+        main.queue_bulk_update(7, 1.0, "")
+        main.queue_bulk_update(3, 0.5, "Missing example")
+
+    def test_sends_queued_grades_once(self):
+        assignment = FakeAssignment(progress=SimpleNamespace(workflow_state="completed"))
+        main.flush_bulk_updates(assignment)
+        main.flush_bulk_updates(assignment)
+        self.assertEqual(assignment.calls, [{7: {"posted_grade": 1.0},
+                                             3: {"posted_grade": 0.5, "text_comment": "Missing example"}}])
+
+    def test_failed_update_is_reported_not_resent(self):
+        assignment = FakeAssignment(error=RuntimeError("502"))
+        with self.assertLogs("grader", level="ERROR") as logs:
+            main.flush_bulk_updates(assignment)
+        main.flush_bulk_updates(assignment)
+        self.assertEqual(len(assignment.calls), 1)
+        self.assertIn("3, 7", logs.output[0])
+
+    def test_polling_gives_up_after_timeout(self):
+        progress = SimpleNamespace(workflow_state="running")
+        progress.query = lambda: progress
+        assignment = FakeAssignment(progress=progress)
+        with mock.patch.object(main, "BULK_TIMEOUT", -1.0), mock.patch.object(main.time, "sleep"), \
+                self.assertLogs("grader", level="ERROR") as logs:
+            main.flush_bulk_updates(assignment)
+        self.assertIn("still running", logs.output[0])
+        self.assertEqual(main.pending_grades, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
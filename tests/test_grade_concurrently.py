@@ -0,0 +1,154 @@
+import asyncio
+import argparse
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import main
+
+
+def submissions(*answers):
+    return [(SimpleNamespace(id=i, name=f"Student {i}"), SimpleNamespace(user_id=i, body=answer, score=None))
+            for i, answer in enumerate(answers)]
+
+
+class FakeModel:
+    """Stands in for aask_model/aask_model_batch and records what was asked."""
+
+    def __init__(self, failures=()):
+        self.single_calls = []
+        self.batch_calls = []
+        self.failures = list(failures)
+
+    def result(self, answer):
+        if answer in self.failures:
+            self.failures.remove(answer)
+            raise RuntimeError(f"model failed on {answer}")
+        return {"grade": float(len(answer)), "comment": answer}
+
+    async def aask_model(self, prompt, task, answer):
+        self.single_calls.append(answer)
+        await asyncio.sleep(0)
+        return self.result(answer)
+
+    async def aask_model_batch(self, prompt, task, answers):
+        self.batch_calls.append(list(answers))
+        await asyncio.sleep(0)
+        return [self.result(answer) for answer in answers]
+
+
+class GradeConcurrentlyTest(unittest.TestCase):
+    def grade(self, items, model, concurrency=4, batch_size=1):
+        results = {}
+        with mock.patch.object(main, "aask_model", model.aask_model), \
+                mock.patch.object(main, "aask_model_batch", model.aask_model_batch):
+            asyncio.run(main.grade_concurrently(
+                items, "prompt", "task", concurrency, batch_size,
+                lambda user, submission, result: results.setdefault(user.id, result),
+            ))
+        return results
+
+    def test_identical_answers_share_one_call(self):
+        model = FakeModel()
+        results = self.grade(submissions("a", "bb", "a", "a", "bb"), model)
+        self.assertEqual(sorted(model.single_calls), ["a", "bb"])
+        self.assertEqual({user_id: result["comment"] for user_id, result in results.items()},
+                         {0: "a", 1: "bb", 2: "a", 3: "a", 4: "bb"})
+
+    def test_batches_fill_up_to_batch_size(self):
+        model = FakeModel()
+        results = self.grade(submissions("a", "b", "c", "d", "e"), model, concurrency=1, batch_size=3)
+        self.assertEqual(model.batch_calls, [["a", "b", "c"], ["d", "e"]])
+        self.assertEqual(model.single_calls, [])
+        self.assertEqual(len(results), 5)
+
+    def test_failed_answer_is_reported_and_requested_again(self):
+        model = FakeModel(failures=["boom"])
+        with self.assertLogs("grader", level="ERROR") as logs:
+            results = self.grade(submissions("boom", "ok", "boom"), model, concurrency=1)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("Student 0", logs.output[0])
+        # The later duplicate is not failed by the earlier error
+        self.assertEqual(model.single_calls, ["boom", "ok", "boom"])
+        self.assertEqual(sorted(results), [1, 2])
+
+    def test_failed_batch_only_loses_its_own_students(self):
+        model = FakeModel(failures=["b"])
+        with self.assertLogs("grader", level="ERROR") as logs:
+            results = self.grade(submissions("a", "b", "c", "d"), model, concurrency=1, batch_size=2)
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(sorted(results), [2, 3])
+
+    def test_failing_result_handler_does_not_stall_the_pipeline(self):
+        handled = []
+
+        def handle_result(user, submission, result):
+            if user.id == 0:
+                raise OSError("disk full")
+            handled.append(user.id)
+
+        model = FakeModel()
+        with mock.patch.object(main, "aask_model", model.aask_model), \
+                mock.patch.object(main, "aask_model_batch", model.aask_model_batch), \
+                self.assertLogs("grader", level="ERROR") as logs:
+            # More answers than the queue holds, with a single consumer
+            items = submissions(*(f"answer {i}" for i in range(main.QUEUE_SIZE * 2)))
+            asyncio.run(asyncio.wait_for(
+                main.grade_concurrently(items, "prompt", "task", 1, 1, handle_result), timeout=5))
+        self.assertIn("disk full", logs.output[0])
+        self.assertEqual(len(handled), main.QUEUE_SIZE * 2 - 1)
+
+    def test_listing_error_propagates_after_queued_answers_are_graded(self):
+        def listing():
+            yield from submissions("a", "b")
+            raise RuntimeError("page 2 failed")
+
+        model = FakeModel()
+        results = {}
+        with mock.patch.object(main, "aask_model", model.aask_model), \
+                mock.patch.object(main, "aask_model_batch", model.aask_model_batch), \
+                self.assertRaisesRegex(RuntimeError, "page 2 failed"):
+            asyncio.run(main.grade_concurrently(
+                listing(), "prompt", "task", 2, 1,
+                lambda user, submission, result: results.setdefault(user.id, result),
+            ))
+        self.assertEqual(sorted(results), [0, 1])
+
+
+    def test_cancellation_stops_grading_queued_answers(self):
+        calls = []
+        handled = []
+
+        async def slow_model(prompt, task, answer):
+            calls.append(answer)
+            await asyncio.sleep(60)
+
+        async def scenario():
+            task = asyncio.create_task(main.grade_concurrently(
+                submissions(*(f"answer {i}" for i in range(20))), "prompt", "task", 2, 1,
+                lambda user, submission, result: handled.append(user.id),
+            ))
+            while len(calls) < 2:
+                await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await asyncio.wait_for(task, timeout=5)
+
+        with mock.patch.object(main, "aask_model", slow_model):
+            asyncio.run(scenario())
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(handled, [])
+
+class PositiveIntTest(unittest.TestCase):
+    def test_accepts_counts_from_one(self):
+        self.assertEqual(main.positive_int("1"), 1)
+        self.assertEqual(main.positive_int("16"), 16)
+
+    def test_rejects_zero_and_negative(self):
+        for value in ("0", "-2"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                main.positive_int(value)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from types import SimpleNamespace
+
+import main
+
+
+class FakeCourse:
+    def __init__(self, submissions):
+        self.submissions = submissions
+        self.calls = []
+
+    def get_multiple_submissions(self, **kwargs):
+        self.calls.append(kwargs)
+        return iter([s for s in self.submissions if s.workflow_state == kwargs["workflow_state"]])
+
+
+def user(user_id):
+    return SimpleNamespace(id=user_id, name=f"Student {user_id}")
+
+
+class IterSubmissionsTest(unittest.TestCase):
+    assignment = SimpleNamespace(id=77)
+
+    def test_csv_students_come_back_in_csv_order(self):
+        course = FakeCourse([
+            SimpleNamespace(user_id=1, workflow_state="submitted"),
+            SimpleNamespace(user_id=2, workflow_state="submitted"),
+            SimpleNamespace(user_id=3, workflow_state="pending_review"),
+        ])
+        users = [user(3), user(4), user(1), user(2)]
+        with self.assertLogs("grader", level="INFO") as logs:
+            pairs = list(main.iter_submissions(course, self.assignment, users))
+        self.assertEqual([u.id for u, _ in pairs], [3, 1, 2])
+        self.assertEqual([call["workflow_state"] for call in course.calls], list(main.GRADABLE_STATES))
+        self.assertTrue(any("Student 4" in line for line in logs.output))
+
+    def test_no_resolved_students_lists_nothing(self):
+        course = FakeCourse([SimpleNamespace(user_id=1, workflow_state="submitted")])
+        with self.assertLogs("grader", level="INFO"):
+            self.assertEqual(list(main.iter_submissions(course, self.assignment, [])), [])
+        self.assertEqual(course.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
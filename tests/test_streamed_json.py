@@ -0,0 +1,63 @@
+import unittest
+from types import SimpleNamespace
+
+from ai import StreamedJSON
+
+
+def chunk(content=None, usage=None):
+    choices = [] if content is None else [SimpleNamespace(delta=SimpleNamespace(content=content))]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class StreamedJSONTest(unittest.TestCase):
+    def test_brace_inside_string_does_not_end_the_object(self):
+        content = StreamedJSON()
+        self.assertFalse(content.feed(chunk('{"grade": "1", "comment": "use {x}')))
+        self.assertIsNone(content.data)
+        self.assertFalse(content.feed(chunk(' here"}')))
+        self.assertEqual(content.json(), {"grade": "1", "comment": "use {x} here"})
+
+    def test_stops_at_trailing_output_but_keeps_usage(self):
+        usage = SimpleNamespace(prompt_tokens=1)
+        content = StreamedJSON()
+        self.assertFalse(content.feed(chunk('{"grade": "1"}')))
+        self.assertTrue(content.feed(chunk("\n\n")))
+        self.assertFalse(content.feed(chunk(usage=usage)))
+        self.assertIs(content.usage, usage)
+        self.assertEqual(content.json(), {"grade": "1"})
+
+    def test_trailing_output_in_the_same_chunk(self):
+        content = StreamedJSON()
+        content.feed(chunk('{"grade": "1"} and some more'))
+        self.assertEqual(content.json(), {"grade": "1"})
+
+    def test_trailing_output_in_the_closing_chunk_still_stops_the_stream(self):
+        content = StreamedJSON()
+        self.assertFalse(content.feed(chunk('{"grade": "1"} trailing')))
+        self.assertEqual(content.data, {"grade": "1"})
+        self.assertTrue(content.feed(chunk(" more")))
+
+    def test_escaped_quotes_inside_strings(self):
+        content = StreamedJSON()
+        self.assertFalse(content.feed(chunk('{"comment": "write \\"}')))
+        self.assertIsNone(content.data)
+        self.assertFalse(content.feed(chunk('\\" here", "grade": "1"}')))
+        self.assertEqual(content.data, {"comment": 'write "}" here', "grade": "1"})
+        self.assertTrue(content.feed(chunk("\n")))
+
+    def test_empty_reply(self):
+        content = StreamedJSON()
+        content.feed(chunk(""))
+        content.feed(chunk(usage=SimpleNamespace(prompt_tokens=1)))
+        with self.assertRaises(ValueError):
+            content.json()
+
+    def test_incomplete_reply(self):
+        content = StreamedJSON()
+        content.feed(chunk('{"grade": "1", "comm'))
+        with self.assertRaises(ValueError):
+            content.json()
+
+
+if __name__ == "__main__":
+    unittest.main()